@@ -1,89 +1,109 @@
 import sys
 import re
+import math
 import argparse
 import json
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, Callable, Iterator, List, Tuple, Optional
 from pathlib import Path
 
 
+_DEFINE_RE = re.compile(r'\(define\s+([a-z][a-z0-9_]*)\s+([^);]+)\)\s*;?', re.DOTALL)
+_DEFINE_STRIP_RE = re.compile(r'\(define[^)]*\)\s*;?')
+_TRUE = frozenset(('true', 'True', 'TRUE'))
+_FALSE = frozenset(('false', 'False', 'FALSE'))
+# Комментарий до конца строки; пробелы по краям строк убирает основной цикл разбора
+_COMMENT_RE = re.compile(r'#[^\n]*')
+# Разделители внутри массива: запятые, скобки и кавычки
+_ARRAY_SCAN_RE = re.compile(r'[,{}"\']')
+
+# Таблица экранирования для строк TOML: спецсимволы и управляющие символы < 32
+_ESCAPE_TABLE = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\t': '\\t',
+    '\r': '\\r',
+    '\b': '\\b',
+    '\f': '\\f',
+})
+for _code in range(32):
+    _ESCAPE_TABLE.setdefault(_code, f'\\u{_code:04x}')
+del _code
+
+# Готовые строки отступов для to_toml
+_INDENTS = tuple('  ' * i for i in range(64))
+
+
 class ConfigParser:
 
-    def __init__(self):
+    def __init__(self) -> None:
         self.constants: Dict[str, Any] = {}
         self.data: Dict[str, Any] = {}
+        self._lines: Iterator[str] = iter(())
 
     def clean_text(self, text: str) -> str:
-        lines = []
-        for line in text.split('\n'):
-            if '#' in line:
-                line = line[:line.index('#')]
-            line = line.rstrip()
-            if line:
-                lines.append(line)
-        return '\n'.join(lines)
+        # Пустые строки не убираем: их пропускает основной цикл разбора
+        if '#' not in text:
+            return text
+        return _COMMENT_RE.sub('', text)
+
+    @staticmethod
+    def _iter_lines(text: str) -> Iterator[str]:
+        # Идёт по строкам через смещения, не создавая список всех строк
+        pos, end = 0, len(text)
+        while pos < end:
+            nl = text.find('\n', pos)
+            if nl < 0:
+                nl = end
+            yield text[pos:nl]
+            pos = nl + 1
 
     def parse_value(self, value_str: str) -> Any:
         value_str = value_str.strip()
 
+        if value_str.endswith(';'):
+            value_str = value_str[:-1].strip()
+
         if not value_str:
             return ''
 
-        if value_str.endswith(';'):
-            value_str = value_str[:-1].strip()
+        # Массивы
+        if value_str[0] == '{' and value_str.endswith('}'):
+            return self._parse_array(value_str)
 
-        # Строки в кавычках
-        if (value_str.startswith('"') and value_str.endswith('"')) or \
-                (value_str.startswith("'") and value_str.endswith("'")):
-            return value_str[1:-1]
+        return self._parse_scalar(value_str)
 
-        # Числа
-        if value_str.isdigit():
-            return int(value_str)
+    def _parse_scalar(self, value_str: str) -> Any:
+        # Разбирает непустое значение, не являющееся массивом
+        first = value_str[0]
 
-        # Числа с плавающей точкой
-        if re.match(r'^-?\d+\.\d+$', value_str):
-            return float(value_str)
+        # Строки в кавычках
+        if first in '"\'':
+            if value_str.endswith(first):
+                return value_str[1:-1]
+
+        # Числа, в том числе отрицательные и с плавающей точкой;
+        # inf, nan и запись с '_' остаются идентификаторами
+        elif (first.isdigit() or (first == '-' and value_str[1:2].isdigit())) and '_' not in value_str:
+            try:
+                return int(value_str)
+            except ValueError:
+                pass
+            try:
+                number = float(value_str)
+            except ValueError:
+                pass
+            else:
+                # Переполнение вроде 1e999 даёт inf; такое значение остаётся идентификатором
+                if math.isfinite(number):
+                    return number
 
         # Булевы значения
-        if value_str.lower() == 'true':
-            return True
-        if value_str.lower() == 'false':
-            return False
-
-        # Массивы
-        if value_str.startswith('{') and value_str.endswith('}'):
-            content = value_str[1:-1].strip()
-            if not content:
-                return []
-
-            items = []
-            current = ''
-            in_quotes = False
-            quote_char = None
-            brace_count = 0
-
-            for char in content:
-                if char in '\'"' and not in_quotes:
-                    in_quotes = True
-                    quote_char = char
-                elif char == quote_char and in_quotes:
-                    in_quotes = False
-                    quote_char = None
-                elif char == '{' and not in_quotes:
-                    brace_count += 1
-                elif char == '}' and not in_quotes:
-                    brace_count -= 1
-                elif char == ',' and not in_quotes and brace_count == 0:
-                    items.append(self.parse_value(current.strip()))
-                    current = ''
-                    continue
-
-                current += char
-
-            if current.strip():
-                items.append(self.parse_value(current.strip()))
-
-            return items
+        elif first in 'tTfF':
+            if value_str in _TRUE:
+                return True
+            if value_str in _FALSE:
+                return False
 
         # Константы
         if value_str in self.constants:
@@ -92,66 +112,80 @@ class ConfigParser:
         # Идентификатор
         return value_str
 
-    def parse_dict(self, lines: List[str], start_idx: int, depth: int = 0) -> Tuple[Dict[str, Any], int]:
-        # парсит словарь
-        result = {}
-        i = start_idx
+    def _parse_array(self, value_str: str) -> List[Any]:
+        # Разбирает массив вида {a, b, c}; кавычки и вложенные скобки не делят элементы
+        content = value_str[1:-1].strip()
+        if not content:
+            return []
+
+        items = []
+        start = 0
+        pos = 0
+        brace_count = 0
+
+        while True:
+            match = _ARRAY_SCAN_RE.search(content, pos)
+            if not match:
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char in '\'"':
+                # Пропускаем строку целиком до закрывающей кавычки
+                close = content.find(char, pos)
+                if close < 0:
+                    break
+                pos = close + 1
+            elif char == '{':
+                brace_count += 1
+            elif char == '}':
+                brace_count -= 1
+            elif brace_count == 0:
+                item = content[start:match.start()].strip()
+                # Вложенные массивы, пустые элементы и элементы с ';' идут через общий разбор
+                if item and item[0] != '{' and item[-1] != ';':
+                    items.append(self._parse_scalar(item))
+                else:
+                    items.append(self.parse_value(item))
+                start = pos
+
+        current = content[start:].strip()
+        if current:
+            if current[0] != '{' and current[-1] != ';':
+                items.append(self._parse_scalar(current))
+            else:
+                items.append(self.parse_value(current))
 
-        while i < len(lines):
-            line = lines[i].strip()
+        return items
+
+    def parse_dict(self) -> Dict[str, Any]:
+        # парсит словарь, забирая строки из общего итератора self._lines
+        result: Dict[str, Any] = {}
+
+        for line in self._lines:
+            line = line.strip()
 
             if not line:
-                i += 1
                 continue
 
             # Конец словаря
             if line == '}':
-                return result, i + 1
-
-            # Разделение ключ и значение
-            if ':' in line:
-                if line.endswith('{'):
-                    key = line.split(':', 1)[0].strip()
-                    nested_dict, next_idx = self.parse_dict(lines, i + 1, depth + 1)
-                    result[key] = nested_dict
-                    i = next_idx
-                    continue
-
-                key, value_part = line.split(':', 1)
-                key = key.strip()
-                value_part = value_part.strip()
-
-                if value_part == '{':
-                    nested_dict, next_idx = self.parse_dict(lines, i + 1, depth + 1)
-                    result[key] = nested_dict
-                    i = next_idx
-                else:
-                    # Простое значение
-                    value = self.parse_value(value_part)
-                    result[key] = value
-                    i += 1
-            elif '=' in line:
-                key, value_part = line.split('=', 1)
-                key = key.strip()
-                value_part = value_part.strip()
-
-                if value_part == '{':
-                    nested_dict, next_idx = self.parse_dict(lines, i + 1, depth + 1)
-                    result[key] = nested_dict
-                    i = next_idx
-                else:
-                    value = self.parse_value(value_part)
-                    result[key] = value
-                    i += 1
-            elif line.endswith('{'):
-                key = line[:-1].strip()
-                nested_dict, next_idx = self.parse_dict(lines, i + 1, depth + 1)
-                result[key] = nested_dict
-                i = next_idx
-            else:
-                i += 1
+                return result
+
+            # Разделитель - первый из ':' и '='
+            sep = line.find(':')
+            eq = line.find('=', 0, sep) if sep >= 0 else line.find('=')
+            if eq >= 0:
+                sep = eq
+
+            if line.endswith('{'):
+                key = line[:sep] if sep >= 0 else line[:-1]
+                result[sys.intern(key.strip())] = self.parse_dict()
+            elif sep >= 0:
+                # Простое значение
+                result[sys.intern(line[:sep].strip())] = self.parse_value(line[sep + 1:])
 
-        return result, i
+        return result
 
     def parse(self, text: str) -> Dict[str, Any]:
         # Очищаем
@@ -160,60 +194,36 @@ class ConfigParser:
 
         text = self.clean_text(text)
 
-        define_pattern = r'\(define\s+([a-z][a-z0-9_]*)\s+([^);]+)\)\s*;?'
-
-        for match in re.finditer(define_pattern, text, re.DOTALL):
-            name = match.group(1)
-            value_str = match.group(2).strip()
+        for define_match in _DEFINE_RE.finditer(text):
+            name = sys.intern(define_match.group(1))
+            value_str = define_match.group(2).strip()
             value = self.parse_value(value_str)
             self.constants[name] = value
 
-        text = re.sub(r'\(define[^)]*\)\s*;?', '', text)
+        # Константы попадают в результат сразу, явные ключи их перезапишут
+        self.data.update(self.constants)
+
+        text = _DEFINE_STRIP_RE.sub('', text)
 
-        lines = text.split('\n')
+        self._lines = self._iter_lines(text)
 
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        for line in self._lines:
+            line = line.strip()
 
             if not line:
-                i += 1
                 continue
 
-            if ':' in line and line.endswith('{'):
-                key = line.split(':', 1)[0].strip()
-                nested_dict, next_idx = self.parse_dict(lines, i + 1, 0)
-                self.data[key] = nested_dict
-                i = next_idx
-            elif '=' in line and line.endswith('{'):
-                key = line.split('=', 1)[0].strip()
-                nested_dict, next_idx = self.parse_dict(lines, i + 1, 0)
-                self.data[key] = nested_dict
-                i = next_idx
-            elif line.endswith('{'):
-                key = line[:-1].strip()
-                nested_dict, next_idx = self.parse_dict(lines, i + 1, 0)
-                self.data[key] = nested_dict
-                i = next_idx
-            elif ':' in line:
-                key, value_part = line.split(':', 1)
-                key = key.strip()
-                value = self.parse_value(value_part)
-                self.data[key] = value
-                i += 1
-            elif '=' in line:
-                key, value_part = line.split('=', 1)
-                key = key.strip()
-                value = self.parse_value(value_part)
-                self.data[key] = value
-                i += 1
-            else:
-                i += 1
+            # Разделитель - первый из ':' и '='
+            sep = line.find(':')
+            eq = line.find('=', 0, sep) if sep >= 0 else line.find('=')
+            if eq >= 0:
+                sep = eq
 
-        # Добавляем константы в результат
-        for key, value in self.constants.items():
-            if key not in self.data:
-                self.data[key] = value
+            if line.endswith('{'):
+                key = line[:sep] if sep >= 0 else line[:-1]
+                self.data[sys.intern(key.strip())] = self.parse_dict()
+            elif sep >= 0:
+                self.data[sys.intern(line[:sep].strip())] = self.parse_value(line[sep + 1:])
 
         return self.data
 
@@ -222,104 +232,99 @@ class TOMLConverter:
 
     @staticmethod
     def escape_string(value: str) -> str:
-        replacements = {
-            '\\': '\\\\',
-            '"': '\\"',
-            '\n': '\\n',
-            '\t': '\\t',
-            '\r': '\\r',
-            '\b': '\\b',
-            '\f': '\\f',
-        }
-
-        result = []
-        for char in value:
-            if char in replacements:
-                result.append(replacements[char])
-            elif ord(char) < 32:
-                result.append(f'\\u{ord(char):04x}')
-            else:
-                result.append(char)
-
-        return ''.join(result)
+        return _escape_string(value)
 
     @staticmethod
     def to_toml(data: Dict[str, Any], indent: int = 0, path: str = '') -> str:
+        out: List[str] = []
+        TOMLConverter._to_toml(data, out, indent, path)
+        return '\n'.join(out)
+
+    @staticmethod
+    def _to_toml(data: Dict[str, Any], out: List[str], indent: int = 0, path: str = '') -> None:
+        # Дописывает строки в общий буфер out, чтобы не склеивать вывод на каждом уровне
         if not data:
-            return ''
+            return
 
-        lines = []
-        indent_str = '  ' * indent
+        indent_str = _INDENTS[indent] if indent < len(_INDENTS) else '  ' * indent
 
-        simple_keys = []
-        dict_keys = []
+        simple_items = []
+        dict_items = []
 
-        for key, value in data.items():
-            if isinstance(value, dict):
-                dict_keys.append(key)
-            else:
-                simple_keys.append(key)
-
-        simple_keys.sort()
-        dict_keys.sort()
-
-        for key in simple_keys:
-            value = data[key]
-
-            if isinstance(value, str):
-                escaped = TOMLConverter.escape_string(value)
-                lines.append(f'{indent_str}{key} = "{escaped}"')
-            elif isinstance(value, bool):
-                lines.append(f'{indent_str}{key} = {str(value).lower()}')
-            elif isinstance(value, (int, float)):
-                lines.append(f'{indent_str}{key} = {value}')
-            elif isinstance(value, list):
-                items = []
-                for item in value:
-                    if isinstance(item, str):
-                        escaped = TOMLConverter.escape_string(item)
-                        items.append(f'"{escaped}"')
-                    elif isinstance(item, bool):
-                        items.append(str(item).lower())
-                    elif isinstance(item, (int, float)):
-                        items.append(str(item))
-                    elif isinstance(item, list):
-                        inner_items = [f'"{i}"' if isinstance(i, str) else str(i) for i in item]
-                        items.append(f'[{", ".join(inner_items)}]')
-                    else:
-                        items.append(f'"{str(item)}"')
-                lines.append(f'{indent_str}{key} = [{", ".join(items)}]')
+        for item in data.items():
+            if isinstance(item[1], dict):
+                dict_items.append(item)
             else:
-                lines.append(f'{indent_str}{key} = "{value}"')
+                simple_items.append(item)
 
-        # Вывод словарей
-        for key in dict_keys:
-            value = data[key]
+        # Ключи уникальны, поэтому пары сортируются только по ключу
+        simple_items.sort()
+        dict_items.sort()
 
+        for key, value in simple_items:
+            out.append(f'{indent_str}{key} = {_format_value(value)}')
+
+        # Вывод словарей
+        for key, value in dict_items:
             if path:
                 full_path = f"{path}.{key}"
             else:
                 full_path = key
 
             if indent == 0:
-                lines.append(f'[{full_path}]')
+                out.append(f'[{full_path}]')
             else:
-                lines.append(f'{indent_str}[{full_path}]')
+                out.append(f'{indent_str}[{full_path}]')
 
-            lines.append(TOMLConverter.to_toml(value, indent + 1, full_path))
+            TOMLConverter._to_toml(value, out, indent + 1, full_path)
 
-        return '\n'.join(lines)
 
+def _escape_string(value: str) -> str:
+    return value.translate(_ESCAPE_TABLE)
 
-def convert_file(input_file: str) -> str:
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
 
-        parser = ConfigParser()
-        data = parser.parse(content)
+def _format_list(value: List[Any]) -> str:
+    return f'[{", ".join(_format_value(item) for item in value)}]'
+
+
+# Форматирование значений по точному типу; bool стоит раньше int для поиска по isinstance
+_VALUE_FORMATTERS: Dict[type, Callable[[Any], str]] = {
+    str: lambda value: f'"{_escape_string(value)}"',
+    bool: lambda value: 'true' if value else 'false',
+    int: str,
+    float: repr,
+    list: _format_list,
+}
+
 
-        return TOMLConverter.to_toml(data)
+def _format_value(value: Any) -> str:
+    formatter = _VALUE_FORMATTERS.get(type(value))
+    if formatter is None:
+        # Подклассы поддерживаемых типов
+        for value_type, type_formatter in _VALUE_FORMATTERS.items():
+            if isinstance(value, value_type):
+                return type_formatter(value)
+        return f'"{value}"'
+    return formatter(value)
+
+
+def load_and_parse(input_file: str) -> Tuple[ConfigParser, Dict[str, Any]]:
+    content = Path(input_file).read_text(encoding='utf-8')
+
+    parser = ConfigParser()
+    data = parser.parse(content)
+
+    return parser, data
+
+
+def render(data: Dict[str, Any]) -> str:
+    return TOMLConverter.to_toml(data)
+
+
+def convert_file(input_file: str) -> str:
+    try:
+        _, data = load_and_parse(input_file)
+        return render(data)
 
     except FileNotFoundError:
         return f"Ошибка: Файл '{input_file}' не найден"
@@ -332,7 +337,7 @@ def convert_file(input_file: str) -> str:
         return f"Ошибка: {str(e)}\n{traceback.format_exc()}"
 
 
-def main():
+def main() -> None:
     parser = argparse.ArgumentParser(
         description='Конвертер учебного конфигурационного языка в TOML',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -384,19 +389,17 @@ def main():
         print(f"Обработка файла: {args.input_file}")
         print("-" * 50)
 
-    result = convert_file(args.input_file)
-
     if args.test:
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        parser = ConfigParser()
-        data = parser.parse(content)
+        # Разбираем файл один раз и используем данные и для JSON, и для TOML
+        _, data = load_and_parse(args.input_file)
+        result = render(data)
 
         print("Парсированные данные (JSON):")
         print(json.dumps(data, indent=2, ensure_ascii=False))
         print("\n" + "=" * 50 + "\n")
         print("Результат в TOML:")
+    else:
+        result = convert_file(args.input_file)
 
     if args.output:
         with open(args.output, 'w', encoding='utf-8') as f: